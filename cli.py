@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import importlib
+import threading
+import socketserver
+
+# Only the standard library is imported at module level: pandas, torch/sentence-transformers,
+# qdrant-client etc. are loaded inside the subcommand that needs them (see `lazy_import`).
+_START = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+
+logger = logging.getLogger("CLI")
+
+# Configuration
+DAEMON_HOST = os.getenv("PIPELINE_DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("PIPELINE_DAEMON_PORT", 8765))
+DAEMON_CONNECT_TIMEOUT = 0.05  # Seconds; fall back to in-process execution if no daemon answers
+DAEMON_READ_TIMEOUT = float(os.getenv("PIPELINE_DAEMON_TIMEOUT", 30))  # Seconds to wait for a reply
+
+IMPORT_TIMES = []
+
+
+def lazy_import(name):
+    """Imports a module on first use and records how long it took for the import-time report."""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.append((name, time.perf_counter() - start))
+    return module
+
+
+def print_import_report(dispatch_time):
+    """Writes per-module import times and total wall time to stderr."""
+    total = time.perf_counter() - _START
+    lines = ["", "Import-time report", f"  {'startup (cli + stdlib)':<45} {dispatch_time * 1000:9.1f} ms"]
+    for name, elapsed in IMPORT_TIMES:
+        lines.append(f"  {name:<45} {elapsed * 1000:9.1f} ms")
+    lines.append(f"  {'total wall time':<45} {total * 1000:9.1f} ms")
+    lines.append("  (run with `python -X importtime cli.py ...` for a per-module breakdown)")
+    print("\n".join(lines), file=sys.stderr)
+
+
+# ==========================================
+# In-process command implementations
+# ==========================================
+def search(query, top_k=5, category=None, mode=None):
+    similarity_search = lazy_import("databases.vector_db.similarity_search")
+    kwargs = {"mode": mode} if mode else {}
+    return similarity_search.search_products(query, top_k=top_k, category_filter=category, **kwargs)
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+def get_recommender():
+    """Returns the process-wide Recommender; daemon handler threads may race to create it."""
+    global _recommender
+    with _recommender_lock:
+        if _recommender is None:
+            _recommender = lazy_import("recommendation.recommender").Recommender()
+        return _recommender
+
+
+def recommend(kind, texts, top_k=3, mode=None):
+    recommender = get_recommender()
+    if kind == "text":
+        kwargs = {"mode": mode} if mode else {}
+        return recommender.get_recommendations_by_text(" ".join(texts), top_k=top_k, **kwargs)
+    return recommender.recommend_for_user_history(texts, top_k=top_k)
+
+
+def cache_stats():
+    """Result-cache metrics for search and recommendations of this process (served by the daemon)."""
+    return {
+        "search_products": lazy_import("databases.vector_db.similarity_search").cache_stats(),
+        "recommender": lazy_import("recommendation.recommender").cache_stats(),
+    }
+
+
+DAEMON_COMMANDS = {
+    "search": search,
+    "recommend": recommend,
+    "cache_stats": cache_stats,
+}
+
+
+# ==========================================
+# Warm daemon
+# ==========================================
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line: {"command": ..., "args": {...}} -> {"result": ...} or {"error": ...}."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = DAEMON_COMMANDS[request["command"]](**request["args"])
+                response = {"result": result}
+            except Exception as e:
+                logger.error(f"Daemon request failed: {e}")
+                response = {"error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+def call_daemon(command, args):
+    """
+    Sends a command to a running daemon.
+
+    Returns:
+        The command result, or None if no daemon is listening or it does not reply in time.
+    """
+    try:
+        sock = socket.create_connection((DAEMON_HOST, DAEMON_PORT), timeout=DAEMON_CONNECT_TIMEOUT)
+    except OSError:
+        return None
+
+    try:
+        with sock:
+            sock.settimeout(DAEMON_READ_TIMEOUT)
+            sock.sendall((json.dumps({"command": command, "args": args}) + "\n").encode())
+            with sock.makefile("r") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+        # Timed out, connection dropped or empty/garbled reply: run the command in-process instead
+        logger.warning(f"Daemon did not answer ({e!r}); running in-process.")
+        return None
+    if "error" in response:
+        raise RuntimeError(f"Daemon error: {response['error']}")
+    return response["result"]
+
+
+def run_daemon():
+    """Loads the embedding models once and serves search/recommend requests on localhost."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - DAEMON - %(message)s')
+    logger.info("Warming up models...")
+    lazy_import("recommendation.embedding_backends").get_backend()
+    recommend("text", ["warm-up"], top_k=1)  # Creates the shared Recommender before any handler thread runs
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((DAEMON_HOST, DAEMON_PORT), DaemonHandler) as server:
+        logger.info(f"Daemon listening on {DAEMON_HOST}:{DAEMON_PORT}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Daemon stopped by user.")
+
+
+def run_warm_or_local(command, args, use_daemon):
+    result = call_daemon(command, args) if use_daemon else None
+    if result is None:
+        result = DAEMON_COMMANDS[command](**args)
+    print(json.dumps(result, indent=2))
+
+
+# ==========================================
+# Subcommands
+# ==========================================
+def cmd_ingest(args):
+    if args.target == "postgres":
+        path = args.path or os.path.join("data", "raw", "sensor_stream.json")
+        lazy_import("ingestion.ingest_postgres").ingest_sensor_data(path)
+    elif args.target == "mongo":
+        path = args.path or os.path.join("data", "raw", "user_events.csv")
+        lazy_import("ingestion.ingest_mongo").ingest_events(path)
+    elif args.target == "vectors":
+        lazy_import("ingestion.ingest_vector_db").ingest_vectors()
+    elif args.target == "index":
+        lazy_import("databases.vector_db.create_index").create_index()
+
+
+def cmd_pipeline(args):
+    if args.name == "batch":
+        lazy_import("pipelines.batch_pipeline").run_pipeline()
+    elif args.name == "stream":
+        lazy_import("pipelines.streaming_pipeline").run_stream_simulation()
+    elif args.name == "load-test":
+        streaming_pipeline = lazy_import("pipelines.streaming_pipeline")
+        report = streaming_pipeline.run_load_test(commit=not args.dry_run)
+        print(json.dumps(report, indent=2))
+    elif args.name == "export":
+        lazy_import("pipelines.export_pipeline").run_exports()
+
+
+def cmd_search(args):
+    run_warm_or_local(
+        "search",
+        {"query": args.query, "top_k": args.top_k, "category": args.category, "mode": args.mode},
+        not args.no_daemon
+    )
+
+
+def cmd_recommend(args):
+    run_warm_or_local(
+        "recommend",
+        {"kind": args.kind, "texts": args.texts, "top_k": args.top_k, "mode": args.mode},
+        not args.no_daemon
+    )
+
+
+def cmd_cache_stats(args):
+    # In-process stats would always be zero, so only the daemon can answer
+    result = call_daemon("cache_stats", {})
+    if result is None:
+        print(f"No daemon is running on {DAEMON_HOST}:{DAEMON_PORT}; start one with `python cli.py daemon`.",
+              file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+
+def cmd_daemon(args):
+    run_daemon()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Databases & Data Pipelines command-line interface.")
+    parser.add_argument("--import-report", action="store_true", help="Print module import times to stderr.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Load raw data into the databases.")
+    ingest.add_argument("target", choices=["postgres", "mongo", "vectors", "index"])
+    ingest.add_argument("--path", help="Input file (postgres/mongo only).")
+    ingest.set_defaults(func=cmd_ingest)
+
+    pipeline = subparsers.add_parser("pipeline", help="Run a batch, streaming or export pipeline.")
+    pipeline.add_argument("name", choices=["batch", "stream", "load-test", "export"])
+    pipeline.add_argument("--dry-run", action="store_true", help="load-test: generate and serialize without writing to PostgreSQL.")
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    search_parser = subparsers.add_parser("search", help="Search the product catalog.")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--top-k", type=int, default=5)
+    search_parser.add_argument("--category")
+    search_parser.add_argument("--mode", choices=["dense", "hybrid", "prefilter"])
+    search_parser.add_argument("--no-daemon", action="store_true", help="Always run in-process.")
+    search_parser.set_defaults(func=cmd_search)
+
+    recommend_parser = subparsers.add_parser("recommend", help="Recommend products.")
+    recommend_parser.add_argument("kind", choices=["text", "history"])
+    recommend_parser.add_argument("texts", nargs="+", help="Query words (text) or liked product descriptions (history).")
+    recommend_parser.add_argument("--top-k", type=int, default=3)
+    recommend_parser.add_argument("--mode", choices=["dense", "hybrid", "prefilter"])
+    recommend_parser.add_argument("--no-daemon", action="store_true", help="Always run in-process.")
+    recommend_parser.set_defaults(func=cmd_recommend)
+
+    stats = subparsers.add_parser("cache-stats", help="Show result-cache hit rates of the running daemon.")
+    stats.set_defaults(func=cmd_cache_stats)
+
+    daemon = subparsers.add_parser("daemon", help="Keep models resident and serve search/recommend requests.")
+    daemon.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    dispatch_time = time.perf_counter() - _START
+    try:
+        args.func(args)
+    finally:
+        if args.import_report:
+            print_import_report(dispatch_time)
+
+
+if __name__ == "__main__":
+    main()
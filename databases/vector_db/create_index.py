@@ -1,10 +1,16 @@
 import os
+import sys
 import time
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams
 import logging
 
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from recommendation.lexical_index import reset_index
+from recommendation.query_cache import bump_catalog_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -31,6 +37,7 @@ def create_index():
         if exists:
             logger.warning(f"Collection '{COLLECTION_NAME}' already exists. Recreating it...")
             client.delete_collection(collection_name=COLLECTION_NAME)
+            reset_index()
         
         # Create collection with Cosine distance
         client.create_collection(
@@ -44,6 +51,9 @@ def create_index():
             field_name="category",
             field_schema="keyword"
         )
+
+        # Invalidate cached search/recommendation results
+        bump_catalog_version()
         
         logger.info(f"Successfully created collection '{COLLECTION_NAME}' with size {VECTOR_SIZE} and Cosine distance.")
         return True
@@ -1,9 +1,15 @@
 import os
+import sys
 import json
 from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
 import logging
 
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from recommendation.embedding_backends import get_backend
+from recommendation.lexical_index import retrieve, SEARCH_MODE
+from recommendation.query_cache import QueryCache, normalize_query
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -14,7 +20,13 @@ QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
 COLLECTION_NAME = "product_embeddings"
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
-def search_products(query_text, top_k=5, category_filter=None):
+_cache = QueryCache("search_products")
+
+def cache_stats():
+    """Hit-rate metrics of the search result cache for this process."""
+    return _cache.stats()
+
+def search_products(query_text, top_k=5, category_filter=None, mode=SEARCH_MODE):
     """
     Performs a semantic search on the product catalog.
     
@@ -22,50 +34,43 @@ def search_products(query_text, top_k=5, category_filter=None):
         query_text (str): The user's search query.
         top_k (int): Number of results to return.
         category_filter (str, optional): Filter results by category.
+        mode (str): 'dense' (vectors only), 'hybrid' (BM25 and vector results merged by
+            reciprocal-rank fusion; 'score' stays the cosine similarity and the fused value is
+            returned as 'fused_score') or 'prefilter' (BM25 candidates restrict the vector search).
+            Falls back to 'dense' when the lexical index has not been built.
         
     Returns:
         list: List of similar products with scores.
     """
+    cache_key = (normalize_query(query_text), top_k, category_filter, mode)
+    cached, version = _cache.lookup(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Load model for query embedding
-        logger.info(f"Loading embedding model: {MODEL_NAME}")
-        model = SentenceTransformer(MODEL_NAME)
-        query_vector = model.encode(query_text).tolist()
+        model = get_backend(model_name=MODEL_NAME)
+        query_vector = model.encode([query_text])[0].tolist()
         
         # Connect to Qdrant
         client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
-        
-        # Define filter if provided
-        query_filter = None
-        if category_filter:
-            from qdrant_client.http import models
-            query_filter = models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="category",
-                        match=models.MatchValue(value=category_filter)
-                    )
-                ]
-            )
-            
-        logger.info(f"Searching for: '{query_text}' (Filter: {category_filter})")
-        
-        search_result = client.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=query_vector,
-            query_filter=query_filter,
-            limit=top_k
-        )
+
+        logger.info(f"Searching for: '{query_text}' (Filter: {category_filter}, Mode: {mode})")
+        hits = retrieve(client, COLLECTION_NAME, query_vector, query_text, top_k, category=category_filter, mode=mode)
         
         results = []
-        for hit in search_result:
-            results.append({
-                "product_id": hit.payload.get("product_id"),
-                "description": hit.payload.get("description"),
-                "category": hit.payload.get("category"),
-                "score": hit.score
-            })
-            
+        for doc_id, score, payload, fused_score in hits:
+            result = {
+                "product_id": payload.get("product_id"),
+                "description": payload.get("description"),
+                "category": payload.get("category"),
+                "score": score
+            }
+            if fused_score is not None:
+                result["fused_score"] = fused_score
+            results.append(result)
+
+        _cache.set(cache_key, results, version)
         return results
 
     except Exception as e:
@@ -86,3 +91,4 @@ if __name__ == "__main__":
     with open(output_path, "w") as f:
         json.dump(results, f, indent=2)
     logger.info(f"Results saved to {output_path}")
+    logger.info(f"Cache stats: {cache_stats()}")
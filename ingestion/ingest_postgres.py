@@ -1,10 +1,9 @@
 import os
-import pandas as pd
 import json
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import execute_values
 import logging
-from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -110,6 +109,22 @@ def ingest_sensor_data(json_file_path):
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
 
+def ingest_sensor_batch(batch, conn, table="sensor_readings"):
+    """
+    Loads a SensorBatch into `table` (sensor_readings by default) with COPY and commits.
+    Used by the streaming path; the batch's sensors must already exist in 'sensors'.
+
+    Returns:
+        int: Number of readings written.
+    """
+    with conn.cursor() as cursor:
+        copy_query = sql.SQL("COPY {} (sensor_id, reading, unit, timestamp, status) FROM STDIN").format(
+            sql.Identifier(table)
+        )
+        cursor.copy_expert(copy_query.as_string(cursor), batch.to_copy_buffer())
+    conn.commit()
+    return len(batch)
+
 if __name__ == "__main__":
     DATA_PATH = os.path.join("data", "raw", "sensor_stream.json")
     ingest_sensor_data(DATA_PATH)
@@ -1,10 +1,16 @@
 import os
+import sys
 import json
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from sentence_transformers import SentenceTransformer
 import logging
 
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recommendation.embedding_backends import get_backend
+from recommendation.lexical_index import LexicalIndex
+from recommendation.query_cache import bump_catalog_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -35,7 +41,7 @@ def ingest_vectors():
     try:
         # Load Model
         logger.info(f"Loading embedding model: {MODEL_NAME}")
-        model = SentenceTransformer(MODEL_NAME)
+        model = get_backend(model_name=MODEL_NAME)
         
         # Connect to Qdrant
         client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
@@ -61,6 +67,14 @@ def ingest_vectors():
             points=points
         )
         
+        # Keep the BM25 index in step with the vector store (same point IDs)
+        lexical_index = LexicalIndex.load() or LexicalIndex()
+        lexical_index.add_documents((point.id, point.payload) for point in points)
+        lexical_index.save()
+
+        # Invalidate cached search/recommendation results
+        bump_catalog_version()
+
         logger.info("Vector ingestion completed successfully.")
 
     except Exception as e:
@@ -0,0 +1,78 @@
+import io
+import datetime
+import numpy as np
+
+# Sensor catalog (matches the seed rows in databases/postgres/init.sql)
+SENSOR_IDS = ("SN-001", "SN-002", "SN-003", "SN-004")
+SENSOR_UNITS = ("celcius", "humidity_percent", "hpa", "motion_binary")
+STATUSES = ("active", "warning", "triggered", "idle")
+
+# One 24-byte record per reading; sensor and status are indices into the tuples above.
+# Aligned (6 padding bytes after status) so the float64/datetime64 columns are read at natural offsets.
+READING_DTYPE = np.dtype([
+    ("sensor", np.uint8),
+    ("status", np.uint8),
+    ("reading", np.float64),
+    ("timestamp", "datetime64[us]"),
+], align=True)
+
+
+class SensorBatch:
+    """
+    Columnar micro-batch of sensor readings backed by a NumPy structured array.
+
+    Replaces a list of per-reading dicts on the hot path: a batch is one contiguous allocation,
+    and `ingest_sensor_batch` streams it straight into PostgreSQL with COPY.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def empty(cls, size):
+        return cls(np.zeros(size, dtype=READING_DTYPE))
+
+    @classmethod
+    def from_readings(cls, readings):
+        """Builds a batch from dicts in the `generate_sensor_reading` / sensor_stream.json format."""
+        batch = cls.empty(len(readings))
+        batch.data["sensor"] = [SENSOR_IDS.index(r["sensor_id"]) for r in readings]
+        batch.data["status"] = [STATUSES.index(r.get("status", "active")) for r in readings]
+        batch.data["reading"] = [r["reading"] for r in readings]
+        batch.data["timestamp"] = [np.datetime64(r["timestamp"].rstrip("Z"), "us") for r in readings]
+        return batch
+
+    def __len__(self):
+        return len(self.data)
+
+    def to_readings(self):
+        """Expands the batch back into per-reading dicts (for JSON output; not for the hot path)."""
+        return [
+            {
+                "sensor_id": SENSOR_IDS[r["sensor"]],
+                "timestamp": r["timestamp"].astype(datetime.datetime).isoformat(),
+                "reading": float(r["reading"]),
+                "unit": SENSOR_UNITS[r["sensor"]],
+                "status": STATUSES[r["status"]],
+            }
+            for r in self.data
+        ]
+
+    def to_copy_buffer(self):
+        """
+        Renders the batch as tab-separated text for
+        `COPY sensor_readings (sensor_id, reading, unit, timestamp, status) FROM STDIN`.
+        """
+        if len(self.data) == 0:
+            return io.StringIO("")
+        # Plain Python lists join considerably faster than numpy string arrays
+        sensors = self.data["sensor"].tolist()
+        columns = (
+            [SENSOR_IDS[i] for i in sensors],
+            [f"{value:.2f}" for value in self.data["reading"].tolist()],
+            [SENSOR_UNITS[i] for i in sensors],
+            np.datetime_as_string(self.data["timestamp"], unit="us").tolist(),
+            [STATUSES[i] for i in self.data["status"].tolist()],
+        )
+        return io.StringIO("\n".join(map("\t".join, zip(*columns))) + "\n")
@@ -1,7 +1,6 @@
 import os
 import pandas as pd
 import logging
-from sqlalchemy import create_engine
 import time
 
 # Configure logging
@@ -79,6 +78,8 @@ def load_data(df, table_name):
     """
     logger.info(f"Loading data into table '{table_name}'...")
     try:
+        from sqlalchemy import create_engine  # Only needed for the load step
+
         engine = create_engine(DB_URL)
         # Using 'replace' for demo purposes; 'append' is typical for production pipelines
         df.to_sql(table_name, engine, if_exists='replace', index=False)
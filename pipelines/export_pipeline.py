@@ -0,0 +1,411 @@
+import os
+import re
+import csv
+import json
+import logging
+import datetime
+import itertools
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import psycopg2
+from pymongo import MongoClient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - EXPORT - %(message)s')
+logger = logging.getLogger("ExportPipeline")
+
+# Configuration
+POSTGRES_USER = os.getenv("POSTGRES_USER", "admin")
+POSTGRES_PASS = os.getenv("POSTGRES_PASSWORD", "password123")
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "pipeline_db")
+
+MONGO_HOST = os.getenv("MONGO_HOST", "localhost")
+MONGO_PORT = int(os.getenv("MONGO_PORT", 27017))
+MONGO_USER = os.getenv("MONGO_INITDB_ROOT_USERNAME", "admin")
+MONGO_PASS = os.getenv("MONGO_INITDB_ROOT_PASSWORD", "password123")
+MONGO_DB = "events_db"
+MONGO_COLLECTION = "user_events"
+
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv")  # csv | jsonl | parquet
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 10000))  # Rows held in client memory at once
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 4))  # Independent queries exported in parallel
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join("outputs", "exports"))
+SQL_QUERIES_PATH = os.path.join("databases", "postgres", "queries.sql")
+
+# Python equivalents of databases/mongo/sample_queries.js (names match outputs/mongo_results.json)
+MONGO_AGGREGATIONS = {
+    "event_type_distribution": [
+        {"$group": {"_id": "$event_type", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$project": {"event_type": "$_id", "count": 1, "_id": 0}}
+    ],
+    "user_engagement_metrics": [
+        {"$match": {"event_type": "view_item", "session_duration": {"$exists": True, "$ne": None}}},
+        {"$group": {
+            "_id": "$user_id",
+            "total_duration_seconds": {"$sum": "$session_duration"},
+            "items_viewed": {"$sum": 1}
+        }},
+        {"$project": {
+            "user_id": "$_id",
+            "items_viewed": 1,
+            "total_duration_minutes": {"$divide": ["$total_duration_seconds", 60]},
+            "_id": 0
+        }}
+    ],
+    "category_performance": [
+        {"$match": {"category": {"$exists": True}}},
+        {"$group": {
+            "_id": "$category",
+            "unique_users": {"$addToSet": "$user_id"},
+            "total_interactions": {"$sum": 1}
+        }},
+        {"$project": {
+            "category": "$_id",
+            "unique_user_count": {"$size": "$unique_users"},
+            "total_interactions": 1,
+            "_id": 0
+        }},
+        {"$sort": {"total_interactions": -1}}
+    ],
+}
+
+# Column types of each aggregation's output, so CSV columns and the Parquet schema never depend
+# on which documents happen to arrive first (e.g. a $sum that is int early on and float later)
+MONGO_SCHEMAS = {
+    "event_type_distribution": {"event_type": "string", "count": "int64"},
+    "user_engagement_metrics": {"user_id": "string", "items_viewed": "int64", "total_duration_minutes": "float64"},
+    "category_performance": {"category": "string", "unique_user_count": "int64", "total_interactions": "int64"},
+}
+
+# PostgreSQL type OIDs (cursor.description type_code) -> export column type; anything else is "string".
+# NUMERIC maps to float64: ROUND(...::numeric, 2) results carry no declared precision or scale.
+POSTGRES_TYPES = {
+    16: "bool",
+    20: "int64", 21: "int64", 23: "int64",
+    700: "float64", 701: "float64", 1700: "float64",
+    1082: "date",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+def load_sql_queries(path=SQL_QUERIES_PATH):
+    """
+    Splits queries.sql into named statements using its '-- N. Title' section headers.
+
+    Returns:
+        dict: snake_case name -> SQL text (without trailing semicolon).
+    """
+    with open(path) as f:
+        content = f.read()
+
+    queries = {}
+    sections = re.split(r"^-- \d+\.\s*", content, flags=re.MULTILINE)[1:]
+    for section in sections:
+        title, _, body = section.partition("\n")
+        name = re.sub(r"[^a-z0-9]+", "_", title.split(":")[-1].strip().lower()).strip("_")
+        statement = "\n".join(line for line in body.splitlines() if not line.strip().startswith("--"))
+        queries[name] = statement.strip().rstrip(";").strip()
+    return queries
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_string(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return str(value)
+
+
+# Export column type -> converter applied to non-null values before building an Arrow column
+COLUMN_CONVERTERS = {
+    "bool": bool,
+    "int64": int,
+    "float64": float,
+    "string": _to_string,
+    "date": None,
+    "timestamp": None,
+    "timestamptz": None,
+}
+
+
+class CsvWriter:
+    extension = "csv"
+
+    def __init__(self, path, types=None):
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._header_written = False
+
+    def write_batch(self, columns, rows):
+        if not self._header_written:
+            self._writer.writerow(columns)
+            self._header_written = True
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesWriter:
+    """Writes one JSON object per line. With `columns=None`, rows are documents written as-is."""
+    extension = "jsonl"
+
+    def __init__(self, path, types=None):
+        self._file = open(path, "w")
+
+    def write_batch(self, columns, rows):
+        if columns is not None:
+            rows = (dict(zip(columns, row)) for row in rows)
+        self._file.writelines(json.dumps(doc, default=_json_default) + "\n" for doc in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes one row group per batch. The schema comes from the declared column types (see
+    COLUMN_CONVERTERS), never from the data, so a value that only appears in a later batch
+    (a wider decimal, a float in an int-looking column, a column that starts out NULL) still fits.
+    """
+    extension = "parquet"
+
+    def __init__(self, path, types=None):
+        import pyarrow  # Optional dependency, only needed for Parquet exports
+        import pyarrow.parquet
+
+        if types is None:
+            raise ValueError("Parquet exports need declared column types")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._path = path
+        self._types = types
+        self._writer = None
+
+    def _arrow_type(self, name):
+        pa = self._pa
+        return {
+            "bool": pa.bool_(),
+            "int64": pa.int64(),
+            "float64": pa.float64(),
+            "string": pa.string(),
+            "date": pa.date32(),
+            "timestamp": pa.timestamp("us"),
+            "timestamptz": pa.timestamp("us", tz="UTC"),
+        }[name]
+
+    def write_batch(self, columns, rows):
+        if self._writer is None:
+            schema = self._pa.schema([(c, self._arrow_type(t)) for c, t in zip(columns, self._types)])
+            self._writer = self._pq.ParquetWriter(self._path, schema)
+
+        arrays = []
+        for i, type_name in enumerate(self._types):
+            convert = COLUMN_CONVERTERS[type_name]
+            values = [row[i] for row in rows]
+            if convert is not None:
+                values = [None if v is None else convert(v) for v in values]
+            arrays.append(values)
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(arrays, self._writer.schema)],
+            schema=self._writer.schema
+        ))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {w.extension: w for w in (CsvWriter, JsonLinesWriter, ParquetWriter)}
+
+
+def _output_path(source, name, fmt):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    return os.path.join(EXPORT_DIR, f"{source}_{name}.{WRITERS[fmt].extension}")
+
+
+def _discard(tmp_path):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def _write_stream(batches, path, fmt, types=None):
+    """
+    Consumes an iterator of (columns, rows) batches into a writer. Writes to a temp file
+    and renames on success so a failed export never leaves a truncated file behind.
+    `types` lists the export type of each column (required for Parquet).
+
+    Returns:
+        int: Rows written, or None if the stream produced no batches (no file is written).
+    """
+    tmp_path = f"{path}.tmp"
+    total = None
+    try:
+        writer = WRITERS[fmt](tmp_path, types)
+        try:
+            for columns, rows in batches:
+                writer.write_batch(columns, rows)
+                total = (total or 0) + len(rows)
+        finally:
+            writer.close()
+        if total is None:
+            # Nothing to describe the output with (and Parquet never created its file)
+            _discard(tmp_path)
+            return None
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return total
+
+
+def get_postgres_connection():
+    conn = psycopg2.connect(
+        host=POSTGRES_HOST,
+        database=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASS,
+        port=POSTGRES_PORT
+    )
+    conn.set_session(readonly=True)
+    return conn
+
+
+def export_postgres_query(name, sql, fmt=EXPORT_FORMAT, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Streams one SQL query to a file with bounded client memory.
+
+    CSV uses `COPY (query) TO STDOUT`, so PostgreSQL formats the rows and the client only relays bytes.
+    Other formats fetch `batch_size` rows at a time from a named (server-side) cursor.
+    """
+    path = _output_path("postgres", name, fmt)
+    conn = get_postgres_connection()
+    try:
+        if fmt == "csv":
+            tmp_path = f"{path}.tmp"
+            try:
+                with conn.cursor() as cursor, open(tmp_path, "w") as f:
+                    cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+                    total = cursor.rowcount
+                os.replace(tmp_path, path)
+            except BaseException:
+                _discard(tmp_path)
+                raise
+        else:
+            with conn.cursor(name=f"export_{name}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(sql)
+                # Named cursors only populate description after the first fetch
+                rows = cursor.fetchmany(batch_size)
+                columns = [d[0] for d in cursor.description]
+                types = [POSTGRES_TYPES.get(d[1], "string") for d in cursor.description]
+
+                def batches(rows):
+                    # Yielded even for an empty result, so an empty query still produces a file
+                    yield columns, rows
+                    while rows:
+                        rows = cursor.fetchmany(batch_size)
+                        if rows:
+                            yield columns, rows
+
+                total = _write_stream(batches(rows), path, fmt, types)
+        conn.commit()
+    finally:
+        conn.close()
+
+    logger.info(f"Exported postgres query '{name}' ({total} rows) to {path}")
+    return path
+
+
+def export_mongo_aggregation(name, pipeline, fmt=EXPORT_FORMAT, batch_size=EXPORT_BATCH_SIZE, schema=None):
+    """
+    Streams one aggregation to a file, pulling `batch_size` documents per cursor round trip.
+
+    JSON Lines writes each document as-is. CSV and Parquet need fixed columns, taken from
+    `schema` (field -> export type, defaults to MONGO_SCHEMAS[name]); Parquet requires it, CSV
+    otherwise uses the keys of the first batch. A document with a field outside the columns
+    raises instead of silently dropping it. An empty result writes no file and returns None.
+    """
+    schema = schema or MONGO_SCHEMAS.get(name)
+    if fmt == "parquet" and schema is None:
+        raise ValueError(f"No schema declared for mongo aggregation '{name}'; add it to MONGO_SCHEMAS")
+    path = _output_path("mongo", name, fmt)
+    client = MongoClient(host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS)
+    try:
+        collection = client[MONGO_DB][MONGO_COLLECTION]
+        cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+        def batches():
+            columns = list(schema) if schema else None
+            while True:
+                docs = list(itertools.islice(cursor, batch_size))
+                if not docs:
+                    return
+                if fmt == "jsonl":
+                    yield None, docs
+                    continue
+                if columns is None:
+                    columns = list(dict.fromkeys(key for doc in docs for key in doc))
+                unexpected = {key for doc in docs for key in doc}.difference(columns)
+                if unexpected:
+                    raise ValueError(
+                        f"Fields {sorted(unexpected)} not in export columns {columns}; use the jsonl format"
+                    )
+                yield columns, [tuple(doc.get(c) for c in columns) for doc in docs]
+
+        total = _write_stream(batches(), path, fmt, list(schema.values()) if schema else None)
+    finally:
+        client.close()
+
+    if total is None:
+        logger.warning(f"Mongo aggregation '{name}' returned no documents; no file written.")
+        return None
+    logger.info(f"Exported mongo aggregation '{name}' ({total} rows) to {path}")
+    return path
+
+
+def run_exports(fmt=EXPORT_FORMAT, batch_size=EXPORT_BATCH_SIZE, workers=EXPORT_WORKERS):
+    """
+    Exports every analytics query (queries.sql + Mongo aggregations) in parallel.
+
+    Returns:
+        dict: export name -> output path, for the exports that succeeded.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(WRITERS)}")
+
+    logger.info(f"Starting exports (format={fmt}, batch_size={batch_size}, workers={workers})...")
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for name, sql in load_sql_queries().items():
+            future = executor.submit(export_postgres_query, name, sql, fmt, batch_size)
+            futures[future] = f"postgres.{name}"
+        for name, pipeline in MONGO_AGGREGATIONS.items():
+            future = executor.submit(export_mongo_aggregation, name, pipeline, fmt, batch_size)
+            futures[future] = f"mongo.{name}"
+
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                logger.error(f"Export '{futures[future]}' failed: {e}")
+
+    logger.info(f"Finished {len(results)}/{len(futures)} exports.")
+    return results
+
+
+if __name__ == "__main__":
+    run_exports()
@@ -1,9 +1,19 @@
+import os
+import sys
 import time
 import json
+import queue
 import random
 import logging
 import datetime
-from ingestion.ingest_postgres import ingest_sensor_data
+import threading
+import numpy as np
+from psycopg2 import sql
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingestion.ingest_postgres import ingest_sensor_data, ingest_sensor_batch, get_db_connection
+from ingestion.sensor_batch import SensorBatch, SENSOR_IDS
 # We will simulate generating a file and calling the ingest function, 
 # or directly calling DB insertion logic if we refactored. 
 # For this demo, we'll generate small batches of JSON and call the existing ingest util.
@@ -12,6 +22,22 @@ from ingestion.ingest_postgres import ingest_sensor_data
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - STREAM - %(message)s')
 logger = logging.getLogger("StreamingPipeline")
 
+# Load test configuration
+STREAM_TARGET_RATE = int(os.getenv("STREAM_TARGET_RATE", 100000))  # Readings per second
+STREAM_DURATION = float(os.getenv("STREAM_DURATION", 10))  # Seconds
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 5000))  # Readings per micro-batch / commit
+STREAM_QUEUE_DEPTH = 8  # Micro-batches buffered between generator and writer
+# Scratch copy of sensor_readings the load test writes to, so synthetic readings never reach analytics.
+# Set to "sensor_readings" to measure the real table (the rows are then kept).
+STREAM_LOAD_TEST_TABLE = os.getenv("STREAM_LOAD_TEST_TABLE", "sensor_readings_load_test")
+
+# Per-sensor reading distributions, indexed like SENSOR_IDS
+SENSOR_BASELINES = np.array([22.0, 45.0, 1013.0, 0.0])
+SENSOR_NOISE = np.array([0.4, 2.0, 1.5, 0.0])
+TEMPERATURE_DAILY_AMPLITUDE = 1.5  # Peak warming around 15:00
+MOTION_PROBABILITY = 0.1
+WARNING_SIGMA = 3.0  # Analog readings beyond this many standard deviations are flagged 'warning'
+
 def generate_sensor_reading():
     """Generates a single synthetic sensor reading."""
     sensors = ["SN-001", "SN-002", "SN-003", "SN-004"]
@@ -34,6 +60,179 @@ def generate_sensor_reading():
         "status": "active"
     }
 
+def generate_sensor_batch(size, start, rate, rng):
+    """
+    Vectorized equivalent of `generate_sensor_reading` for `size` readings.
+
+    Args:
+        size: Number of readings.
+        start: numpy datetime64 timestamp of the first reading.
+        rate: Readings per second; timestamps are spaced evenly at this rate.
+        rng: numpy Generator.
+
+    Returns:
+        SensorBatch
+    """
+    batch = SensorBatch.empty(size)
+    data = batch.data
+
+    sensor = rng.integers(0, len(SENSOR_IDS), size, dtype=np.uint8)
+    offsets_us = (np.arange(size) * (1e6 / rate)).astype(np.int64)
+    timestamps = start + offsets_us.astype("timedelta64[us]")
+
+    # Analog sensors: gaussian noise around a baseline, with a daily cycle for temperature
+    z = rng.standard_normal(size)
+    reading = SENSOR_BASELINES[sensor] + z * SENSOR_NOISE[sensor]
+    hour = (timestamps.astype(np.int64) / 3.6e9) % 24
+    is_temperature = sensor == 0
+    reading[is_temperature] += TEMPERATURE_DAILY_AMPLITUDE * np.sin(2 * np.pi * (hour[is_temperature] - 9) / 24)
+
+    # Motion sensor: binary events
+    is_motion = sensor == 3
+    motion = rng.random(size) < MOTION_PROBABILITY
+    reading[is_motion] = motion[is_motion]
+
+    status = np.zeros(size, dtype=np.uint8)  # active
+    status[~is_motion & (np.abs(z) > WARNING_SIGMA)] = 1  # warning
+    status[is_motion & motion] = 2  # triggered
+
+    data["sensor"] = sensor
+    data["status"] = status
+    data["reading"] = np.round(reading, 2)
+    data["timestamp"] = timestamps
+    return batch
+
+def create_load_test_table(conn, table):
+    """
+    (Re)creates `table` as an empty UNLOGGED copy of sensor_readings with the same columns and
+    indexes, so COPY does comparable index work without WAL or touching the real table.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+        cursor.execute(sql.SQL("CREATE UNLOGGED TABLE {} (LIKE sensor_readings INCLUDING INDEXES)").format(
+            sql.Identifier(table)
+        ))
+        # LIKE does not copy the SERIAL default; give the scratch table its own id sequence
+        cursor.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN id ADD GENERATED ALWAYS AS IDENTITY").format(
+            sql.Identifier(table)
+        ))
+    conn.commit()
+
+
+def drop_load_test_table(conn, table):
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+    conn.commit()
+
+
+def run_load_test(target_rate=STREAM_TARGET_RATE, duration=STREAM_DURATION,
+                  batch_size=STREAM_BATCH_SIZE, commit=True, table=STREAM_LOAD_TEST_TABLE, keep_table=False):
+    """
+    Streams generated micro-batches into PostgreSQL at a target rate and reports throughput
+    and generation-to-commit latency.
+
+    A generator thread emits each batch once its last reading's timestamp is due, so latency
+    covers queueing, COPY and commit. If the writer cannot keep up, the bounded queue blocks
+    the generator and the achieved rate falls below the target.
+
+    Args:
+        target_rate: Readings per second to generate.
+        duration: Seconds of readings to generate (the last batch may be partial).
+        batch_size: Readings per micro-batch (one COPY + commit each).
+        commit: If False, batches are generated and serialized for COPY but not sent to PostgreSQL
+            (measures the client-side cost without the database).
+        table: Table to write to. Unless it is sensor_readings, it is recreated as an UNLOGGED
+            scratch copy before the run and dropped afterwards.
+        keep_table: Keep the scratch table after the run for inspection.
+
+    Returns:
+        dict: Readings, achieved rate and p50/p99/max latency in milliseconds.
+    """
+    rng = np.random.default_rng()
+    batches = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    total_readings = max(1, round(target_rate * duration))
+    ns_per_reading = 1e9 / target_rate
+    scratch = table != "sensor_readings"
+
+    producer_errors = []
+
+    def produce():
+        try:
+            for first in range(0, total_readings, batch_size):
+                size = min(batch_size, total_readings - first)
+                start = t0_wall + np.timedelta64(int(first * ns_per_reading / 1000), "us")
+                batch = generate_sensor_batch(size, start, target_rate, rng)
+                wait = (t0 + (first + size) * ns_per_reading - time.perf_counter_ns()) / 1e9
+                if wait > 0:
+                    time.sleep(wait)
+                batches.put(batch)
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            # Always release the consumer, even if generation failed
+            batches.put(None)
+
+    logger.info(f"Starting load test: {target_rate} readings/s for {duration}s in batches of {batch_size}...")
+    conn = get_db_connection() if commit else None
+    if commit and conn is None:
+        return None
+    if commit and scratch:
+        try:
+            create_load_test_table(conn, table)
+        except Exception:
+            conn.close()
+            raise
+    elif commit:
+        logger.warning("Writing load-test readings into sensor_readings; they will show up in analytics queries.")
+
+    # Reading timestamps are wall-clock; map them back onto the monotonic clock for latency
+    t0_wall = np.datetime64(datetime.datetime.now(), "us")
+    t0 = time.perf_counter_ns()
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    latencies = []
+    readings = 0
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if commit:
+                ingest_sensor_batch(batch, conn, table)
+            else:
+                batch.to_copy_buffer()  # Keep the serialization cost in dry runs
+            done = time.perf_counter_ns() - t0
+            generated = (batch.data["timestamp"] - t0_wall).astype(np.int64) * 1000
+            latencies.append(done - generated)
+            readings += len(batch)
+    finally:
+        if conn is not None:
+            try:
+                if scratch and not keep_table:
+                    conn.rollback()  # Leave any failed COPY transaction before dropping
+                    drop_load_test_table(conn, table)
+            finally:
+                conn.close()
+
+    if producer_errors:
+        logger.error(f"Load test generator failed: {producer_errors[0]}")
+        raise RuntimeError("Load test generator failed") from producer_errors[0]
+
+    elapsed = (time.perf_counter_ns() - t0) / 1e9
+    latencies = np.concatenate(latencies) / 1e6
+    report = {
+        "readings": readings,
+        "elapsed_s": round(elapsed, 3),
+        "target_rate": target_rate,
+        "achieved_rate": round(readings / elapsed),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "latency_max_ms": round(float(latencies.max()), 2),
+    }
+    logger.info(f"Load test finished: {report}")
+    return report
+
 def run_stream_simulation(iterations=5, delay=2):
     """
     Simulates a streaming source by generating micro-batches and processing them.
@@ -71,11 +270,9 @@ def run_stream_simulation(iterations=5, delay=2):
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
-import os
 if __name__ == "__main__":
-    # Ensure dependencies from parent dir can be imported if running direct
     # In production, this would be a proper module or kafka consumer
-    import sys
-    sys.path.append(os.getcwd())
-    
-    run_stream_simulation()
+    if os.getenv("STREAM_MODE") == "load_test":
+        run_load_test()
+    else:
+        run_stream_simulation()
@@ -0,0 +1,360 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")  # Hub name or path to a locally saved model
+BACKEND_NAME = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | quantized | onnx
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+INTRA_OP_THREADS = int(os.getenv("EMBEDDING_INTRA_OP_THREADS", 0))  # 0 = runtime default
+INTER_OP_THREADS = int(os.getenv("EMBEDDING_INTER_OP_THREADS", 0))
+ONNX_CACHE_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(os.path.expanduser("~"), ".cache", "embedding_onnx"))
+
+# Maximum allowed (1 - cosine similarity) between a backend and the reference torch model
+COSINE_TOLERANCE = {
+    "torch": 1e-5,
+    "onnx": 1e-4,
+    "quantized": 2e-2,
+}
+
+
+def length_buckets(texts, batch_size):
+    """
+    Yields lists of indices into `texts`, grouped by length so each batch pads to a similar size.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+
+def configure_torch_threads(intra_op_threads, inter_op_threads):
+    """Applies intra-op / inter-op thread counts to torch (0 keeps the default)."""
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            logger.warning("Inter-op thread count already fixed for this process; keeping current value.")
+
+
+class EmbeddingBackend:
+    """
+    Base class for embedding backends. Subclasses implement `_encode_batch` for one length bucket.
+    """
+    name = None
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=BATCH_SIZE,
+                 intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.dimension = None
+
+    def encode(self, texts):
+        """
+        Encodes a list of strings into a (len(texts), dimension) float32 array, preserving input order.
+        """
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for bucket in length_buckets(texts, self.batch_size):
+            embeddings[bucket] = self._encode_batch([texts[i] for i in bucket])
+        return embeddings
+
+    def _encode_batch(self, texts):
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    """
+    Stock PyTorch SentenceTransformer. Serves as the reference implementation for parity checks.
+    """
+    name = "torch"
+
+    def __init__(self, *args, device=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        from sentence_transformers import SentenceTransformer
+
+        configure_torch_threads(self.intra_op_threads, self.inter_op_threads)
+        if device is None:
+            device = 'cuda' if os.environ.get('CUDA_VISIBLE_DEVICES') else 'cpu'
+        self.device = device
+        self.model = SentenceTransformer(self.model_name, device=device)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def _encode_batch(self, texts):
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    SentenceTransformer with its Linear layers dynamically quantized to int8 (CPU only).
+    """
+    name = "quantized"
+
+    def __init__(self, *args, **kwargs):
+        kwargs["device"] = "cpu"
+        super().__init__(*args, **kwargs)
+        import torch
+
+        logger.info("Applying dynamic int8 quantization to Linear layers...")
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Runs the transformer through ONNX Runtime on CPU and applies the model's pooling in NumPy.
+    The ONNX graph is exported from the SentenceTransformer on first use and cached on disk, next
+    to the tokenizer and a JSON sidecar. Later starts only read those and never import torch.
+    """
+    name = "onnx"
+
+    def __init__(self, *args, onnx_path=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        import onnxruntime as ort
+
+        fingerprint = self._fingerprint()
+        if onnx_path is None and fingerprint is not None:
+            onnx_path = self._cache_path(fingerprint)
+        metadata = self._read_sidecar(onnx_path, fingerprint) if onnx_path else None
+
+        if metadata is None:
+            # Cold start: load the torch model once to export it (downloading it if needed)
+            from sentence_transformers import SentenceTransformer
+
+            st_model = SentenceTransformer(self.model_name, device="cpu")
+            metadata = self._describe(st_model)
+            fingerprint = self._fingerprint()
+            if fingerprint is None:
+                logger.warning(f"Could not locate the files of {self.model_name}; the ONNX export will not be reused.")
+                fingerprint = hashlib.sha256(self.model_name.encode()).hexdigest()[:16]
+            if onnx_path is None:
+                onnx_path = self._cache_path(fingerprint)
+            self._export(st_model, onnx_path)
+            st_model.tokenizer.save_pretrained(self._tokenizer_dir(onnx_path))
+            self._write_sidecar(onnx_path, dict(metadata, fingerprint=fingerprint))
+            del st_model
+
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self._tokenizer_dir(onnx_path))
+        self.pooling = metadata["pooling"]
+        self.normalize = metadata["normalize"]
+        self.max_seq_length = metadata["max_seq_length"]
+        self.dimension = metadata["dimension"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            options.inter_op_num_threads = self.inter_op_threads
+
+        logger.info(f"Loading ONNX model from {onnx_path}")
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _model_dir(self):
+        """Local directory holding the model files, or None if a hub model has not been downloaded yet."""
+        if os.path.isdir(self.model_name):
+            return os.path.realpath(self.model_name)
+        try:
+            from huggingface_hub import snapshot_download
+        except ImportError:
+            return None
+        repo_id = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+        try:
+            return snapshot_download(repo_id, local_files_only=True)
+        except Exception:
+            return None
+
+    def _fingerprint(self):
+        """
+        Hashes the model location plus the path, size and mtime of every model file, so a different
+        model with the same directory name, or a retrained one, never reuses a stale exported graph.
+        Only stats files; returns None if the model is not available locally.
+        """
+        model_dir = self._model_dir()
+        if model_dir is None:
+            return None
+        digest = hashlib.sha256(model_dir.encode())
+        for root, dirs, files in os.walk(model_dir):
+            dirs.sort()
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                st = os.stat(path)  # Follows hub cache symlinks to the blobs
+                digest.update(f"{os.path.relpath(path, model_dir)}:{st.st_size}:{st.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    def _cache_path(self, fingerprint):
+        model_id = os.path.basename(os.path.normpath(self.model_name))
+        return os.path.join(ONNX_CACHE_DIR, f"{model_id}-{fingerprint}.onnx")
+
+    @staticmethod
+    def _sidecar_path(onnx_path):
+        return f"{os.path.splitext(onnx_path)[0]}.json"
+
+    @staticmethod
+    def _tokenizer_dir(onnx_path):
+        return f"{os.path.splitext(onnx_path)[0]}-tokenizer"
+
+    def _read_sidecar(self, onnx_path, fingerprint):
+        """Returns the cached export's metadata, or None if it is missing or was built from other model files."""
+        try:
+            with open(self._sidecar_path(onnx_path)) as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if fingerprint is None or metadata.get("fingerprint") != fingerprint or not os.path.exists(onnx_path):
+            return None
+        return metadata
+
+    def _write_sidecar(self, onnx_path, metadata):
+        # Written last and atomically, so an interrupted export is never picked up as valid
+        path = self._sidecar_path(onnx_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(metadata, model=self.model_name), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _describe(self, st_model):
+        """
+        Reads what `_encode_batch` needs from the SentenceTransformer pipeline. Only Transformer ->
+        Pooling (cls or mean) -> optional Normalize is supported; anything else (e.g. a Dense
+        projection) would change the embeddings, so it is rejected here rather than dropped.
+        """
+        from sentence_transformers.models import Transformer, Pooling, Normalize
+
+        modules = list(st_model)
+        if len(modules) < 2 or not isinstance(modules[0], Transformer) or not isinstance(modules[1], Pooling):
+            raise ValueError(
+                f"ONNX backend needs a Transformer followed by Pooling; got {[type(m).__name__ for m in modules]}"
+            )
+        unsupported = [type(m).__name__ for m in modules[2:] if not isinstance(m, Normalize)]
+        if unsupported:
+            raise ValueError(
+                f"ONNX backend does not support modules {unsupported} in {self.model_name}; "
+                "use the torch or quantized backend"
+            )
+
+        pooling = modules[1].get_pooling_mode_str()
+        if pooling not in ("cls", "mean"):
+            raise ValueError(f"Unsupported pooling for ONNX backend: {pooling}")
+
+        return {
+            "pooling": pooling,
+            "normalize": len(modules) > 2,
+            "max_seq_length": st_model.max_seq_length,
+            "dimension": st_model.get_sentence_embedding_dimension(),
+        }
+
+    def _export(self, st_model, onnx_path):
+        """Exports the underlying HF transformer of `st_model` to ONNX with dynamic batch/sequence axes."""
+        import torch
+
+        logger.info(f"Exporting {self.model_name} to ONNX at {onnx_path}...")
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        auto_model = st_model[0].auto_model
+        dummy = st_model.tokenizer(["export"], return_tensors="pt")
+        input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in dummy]
+        dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                auto_model,
+                tuple(dummy[n] for n in input_names),
+                onnx_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+    def _encode_batch(self, texts):
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        feeds = {n: encoded[n].astype(np.int64) for n in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = feeds["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(name=BACKEND_NAME, **kwargs):
+    """
+    Instantiates an embedding backend by name ('torch', 'quantized' or 'onnx').
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    logger.info(f"Initializing '{name}' embedding backend (batch_size={kwargs.get('batch_size', BATCH_SIZE)})")
+    return BACKENDS[name](**kwargs)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name=BACKEND_NAME, model_name=MODEL_NAME):
+    """
+    Returns the process-wide backend for (name, model_name), creating it on first use.
+    All callers (EmbeddingModel, similarity search, ingestion) share the same loaded model.
+    """
+    key = (name, model_name)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = create_backend(name, model_name=model_name)
+        return _backends[key]
+
+
+def max_cosine_deviation(reference, candidate):
+    """
+    Returns the largest (1 - cosine similarity) between matching rows of two embedding matrices.
+    """
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return float(np.max(1.0 - np.sum(reference * candidate, axis=1)))
+
+
+def check_parity(candidate, texts, reference=None):
+    """
+    Compares a backend against the reference torch backend on `texts`.
+
+    Returns:
+        tuple: (max cosine deviation, whether it is within COSINE_TOLERANCE for the backend).
+    """
+    if reference is None:
+        reference = TorchBackend(model_name=candidate.model_name, device="cpu")
+    deviation = max_cosine_deviation(reference.encode(texts), candidate.encode(texts))
+    return deviation, deviation <= COSINE_TOLERANCE[candidate.name]
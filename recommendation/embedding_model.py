@@ -1,17 +1,22 @@
 import os
-from sentence_transformers import SentenceTransformer
+import sys
 import logging
 
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recommendation.embedding_backends import get_backend, check_parity, BACKEND_NAME
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - EMBEDDING - %(message)s')
 logger = logging.getLogger(__name__)
 
 class EmbeddingModel:
     """
-    Singleton wrapper for the SentenceTransformer model to ensure efficient resource usage.
+    Singleton wrapper for the shared embedding backend to ensure efficient resource usage.
+    The backend (torch, quantized or onnx) is selected via the EMBEDDING_BACKEND env variable.
     """
     _instance = None
-    _model = None
+    _backend = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -19,27 +24,36 @@ class EmbeddingModel:
             cls.model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
             try:
                 logger.info(f"Loading embedding model: {cls.model_name}...")
-                cls._model = SentenceTransformer(cls.model_name)
+                cls._backend = get_backend(BACKEND_NAME, model_name=cls.model_name)
                 logger.info("Model loaded successfully.")
             except Exception as e:
                 logger.error(f"Failed to load model: {e}")
-                cls._model = None
+                cls._backend = None
         return cls._instance
 
     def encode(self, text_or_list):
         """
         Generates embeddings for a string or list of strings.
         """
-        if self._model is None:
+        if self._backend is None:
             raise RuntimeError("Embedding model is not initialized.")
-        
-        # Check for CUDA availability (optional optimization)
-        device = 'cuda' if os.environ.get('CUDA_VISIBLE_DEVICES') else 'cpu'
-        
-        return self._model.encode(text_or_list, device=device)
+
+        if isinstance(text_or_list, str):
+            return self._backend.encode([text_or_list])[0]
+        return self._backend.encode(list(text_or_list))
 
 if __name__ == "__main__":
     # Test
     model = EmbeddingModel()
     vector = model.encode("Test sentence")
     print(f"Vector dimension: {len(vector)}")
+
+    # Parity check against the reference torch model (works offline with a local EMBEDDING_MODEL path)
+    if model._backend.name != "torch":
+        samples = [
+            "Wireless noise-canceling headphones with long battery life.",
+            "Science fiction novel about interstellar travel and AI ethics.",
+            "All-weather car floor mats",
+        ]
+        deviation, ok = check_parity(model._backend, samples)
+        print(f"Max cosine deviation vs torch: {deviation:.6f} ({'OK' if ok else 'OUT OF TOLERANCE'})")
@@ -0,0 +1,283 @@
+import os
+import re
+import math
+import pickle
+import logging
+from array import array
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Independent of the working directory
+INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(ROOT_DIR, "data", "processed", "lexical_index.pkl"))
+SEARCH_MODE = os.getenv("SEARCH_MODE", "dense")  # dense | hybrid | prefilter
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", 100))  # Candidate pool size for prefilter mode
+RRF_K = 60  # Standard reciprocal-rank-fusion damping constant
+INDEXED_FIELDS = ("product_id", "category", "description")
+WHOLE_TOKEN_FIELDS = ("product_id",)  # Shared prefixes like "prod" would otherwise match every product
+FORMAT_VERSION = 2  # Bump when tokenization changes; older saved indexes are ignored and rebuilt
+
+# Words plus model-number style tokens such as "xr-500" or "v2.1"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+TOKEN_SPLIT = re.compile(r"[-./]")
+
+
+def tokenize(text, split_compounds=True):
+    """
+    Lowercases and splits text into terms. Compound tokens ("XR-500") are kept whole
+    and, unless `split_compounds` is False, also emitted as their parts.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if split_compounds and TOKEN_SPLIT.search(token):
+            tokens.extend(TOKEN_SPLIT.split(token))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index over product payloads.
+
+    Postings are stored per term as two compact uint32 arrays (internal doc index, term frequency),
+    and scoring is vectorized with NumPy over the postings of the query terms only.
+    """
+
+    def __init__(self, fields=INDEXED_FIELDS, k1=1.2, b=0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_ids = []  # internal index -> external (Qdrant point) id, None once removed
+        self.payloads = []
+        self.doc_lengths = array('I')
+        self.id_map = {}
+        self.total_length = 0
+        self.format_version = FORMAT_VERSION
+
+    def __len__(self):
+        return len(self.id_map)
+
+    def _document_tokens(self, payload):
+        tokens = []
+        for field in self.fields:
+            if payload.get(field) is not None:
+                tokens.extend(tokenize(str(payload[field]), split_compounds=field not in WHOLE_TOKEN_FIELDS))
+        return tokens
+
+    def add_document(self, doc_id, payload):
+        """Indexes a payload under `doc_id`, replacing any previous version of that document."""
+        if doc_id in self.id_map:
+            self.remove_document(doc_id)
+
+        tokens = self._document_tokens(payload)
+        idx = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.payloads.append(payload)
+        self.doc_lengths.append(len(tokens))
+        self.id_map[doc_id] = idx
+        self.total_length += len(tokens)
+
+        for term, tf in Counter(tokens).items():
+            ids, tfs = self.postings.setdefault(term, (array('I'), array('I')))
+            ids.append(idx)
+            tfs.append(tf)
+
+    def add_documents(self, documents):
+        """Indexes an iterable of (doc_id, payload) pairs, replacing existing versions in one pass."""
+        documents = list(documents)
+        self.remove_documents([doc_id for doc_id, _ in documents])
+        for doc_id, payload in documents:
+            self.add_document(doc_id, payload)
+
+    def remove_document(self, doc_id):
+        self.remove_documents([doc_id])
+
+    def remove_documents(self, doc_ids):
+        """Removes documents from the postings; their slots are reclaimed by `compact`."""
+        removed = [self.id_map.pop(doc_id) for doc_id in doc_ids if doc_id in self.id_map]
+        if not removed:
+            return
+
+        terms = set()
+        for idx in removed:
+            terms.update(self._document_tokens(self.payloads[idx]))
+            self.total_length -= self.doc_lengths[idx]
+            self.doc_lengths[idx] = 0
+            self.doc_ids[idx] = None
+            self.payloads[idx] = None
+
+        removed = np.array(removed, dtype=np.uint32)
+        for term in terms:
+            ids, tfs = self.postings[term]
+            keep = ~np.isin(np.frombuffer(ids, dtype=np.uint32), removed)
+            if keep.any():
+                self.postings[term] = (
+                    array('I', np.frombuffer(ids, dtype=np.uint32)[keep].tobytes()),
+                    array('I', np.frombuffer(tfs, dtype=np.uint32)[keep].tobytes())
+                )
+            else:
+                del self.postings[term]
+
+    def compact(self):
+        """Drops tombstones left by removed/replaced documents and renumbers internal indices."""
+        alive = [i for i, d in enumerate(self.doc_ids) if d is not None]
+        if len(alive) == len(self.doc_ids):
+            return
+
+        remap = np.full(len(self.doc_ids), -1, dtype=np.int64)
+        remap[alive] = np.arange(len(alive))
+        for term, (ids, tfs) in self.postings.items():
+            new_ids = remap[np.frombuffer(ids, dtype=np.uint32)]
+            self.postings[term] = (array('I', new_ids.astype(np.uint32).tobytes()), tfs)
+
+        self.doc_ids = [self.doc_ids[i] for i in alive]
+        self.payloads = [self.payloads[i] for i in alive]
+        self.doc_lengths = array('I', (self.doc_lengths[i] for i in alive))
+        self.id_map = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+    def search(self, query, top_k=10, category=None):
+        """
+        Returns up to `top_k` (doc_id, bm25_score, payload) tuples, best first.
+        Only documents sharing at least one term with the query are returned.
+        """
+        num_docs = len(self.id_map)
+        if num_docs == 0:
+            return []
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        avg_length = self.total_length / num_docs
+
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            ids = np.frombuffer(ids, dtype=np.uint32)
+            tf = np.frombuffer(tfs, dtype=np.uint32).astype(np.float32)
+            idf = math.log(1.0 + (num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[ids] / avg_length)
+            scores[ids] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        candidates = np.nonzero(scores)[0]
+        if category is not None:
+            candidates = candidates[[self.payloads[i].get("category") == category for i in candidates]]
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [(self.doc_ids[i], float(scores[i]), self.payloads[i]) for i in candidates]
+
+    def save(self, path=INDEX_PATH):
+        """Compacts and atomically writes the index so concurrent readers never see a partial file."""
+        self.compact()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        # Plain state rather than the object, so it loads regardless of how this module was imported
+        with open(tmp_path, "wb") as f:
+            pickle.dump(vars(self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved lexical index with {len(self)} documents to {path}")
+
+    @staticmethod
+    def load(path=INDEX_PATH):
+        """Loads a saved index, or returns None if it has not been built yet (or is outdated)."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("format_version") != FORMAT_VERSION:
+            logger.warning(f"Ignoring lexical index at {path} built with an older format; re-run vector ingestion.")
+            return None
+        index = LexicalIndex()
+        vars(index).update(state)
+        return index
+
+
+_cache = {}
+
+def get_index(path=INDEX_PATH):
+    """
+    Returns the saved index for `path`, reloading it only when the file has changed on disk.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        _cache.pop(path, None)
+        return None
+
+    cached = _cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, LexicalIndex.load(path))
+        _cache[path] = cached
+    return cached[1]
+
+
+def reset_index(path=INDEX_PATH):
+    """Deletes the saved index (e.g. when the vector collection is recreated)."""
+    if os.path.exists(path):
+        os.remove(path)
+        logger.info(f"Removed lexical index at {path}")
+
+
+def reciprocal_rank_fusion(result_lists, top_k, k=RRF_K):
+    """
+    Merges ranked lists of (doc_id, score, payload) tuples by reciprocal-rank fusion.
+
+    Returns:
+        list: Up to `top_k` (doc_id, fused_score, payload) tuples, best first.
+    """
+    fused = {}
+    payloads = {}
+    for results in result_lists:
+        for rank, (doc_id, _, payload) in enumerate(results):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+            payloads.setdefault(doc_id, payload)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [(doc_id, score, payloads[doc_id]) for doc_id, score in ranked]
+
+
+def retrieve(client, collection_name, query_vector, query_text, top_k, category=None, mode=SEARCH_MODE):
+    """
+    Runs a Qdrant vector search combined with the lexical index according to `mode`:
+    'dense' (vectors only), 'hybrid' (BM25 and vector results merged by reciprocal-rank fusion)
+    or 'prefilter' (BM25 candidates restrict the vector search). Falls back to 'dense' when the
+    lexical index has not been built.
+
+    Returns:
+        list: Up to `top_k` (doc_id, cosine_score, payload, fused_score) tuples, best first.
+            cosine_score is None for keyword-only hybrid matches; fused_score is None unless fused.
+    """
+    from qdrant_client.http import models
+
+    lexical_hits = []
+    lexical_index = get_index() if mode != "dense" else None
+    if lexical_index is not None:
+        depth = LEXICAL_CANDIDATES if mode == "prefilter" else top_k
+        lexical_hits = lexical_index.search(query_text, top_k=depth, category=category)
+
+    conditions = []
+    if category:
+        conditions.append(models.FieldCondition(key="category", match=models.MatchValue(value=category)))
+    if mode == "prefilter" and lexical_hits:
+        # Only score the vectors of documents that matched the query terms
+        conditions.append(models.HasIdCondition(has_id=[doc_id for doc_id, _, _ in lexical_hits]))
+
+    search_result = client.search(
+        collection_name=collection_name,
+        query_vector=query_vector,
+        query_filter=models.Filter(must=conditions) if conditions else None,
+        limit=top_k
+    )
+    hits = [(hit.id, hit.score, hit.payload) for hit in search_result]
+
+    if mode != "hybrid" or not lexical_hits:
+        return [(doc_id, score, payload, None) for doc_id, score, payload in hits]
+
+    # Fused ranking, but the score stays the cosine similarity
+    dense_scores = {doc_id: score for doc_id, score, _ in hits}
+    fused = reciprocal_rank_fusion([hits, lexical_hits], top_k)
+    return [(doc_id, dense_scores.get(doc_id), payload, fused_score) for doc_id, fused_score, payload in fused]
@@ -0,0 +1,238 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 300))  # Seconds; 0 disables caching
+CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 10000))
+CACHE_SHARED_PATH = os.getenv("QUERY_CACHE_PATH")  # Optional SQLite file shared by workers on one host
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Independent of the working directory
+CATALOG_VERSION_PATH = os.getenv("CATALOG_VERSION_PATH", os.path.join(ROOT_DIR, "data", "processed", "catalog_version"))
+VERSION_CHECK_INTERVAL = 1.0  # Seconds between checks of the catalog version file
+
+_version_state = {"checked_at": 0.0, "stat": None, "version": 0}
+_version_lock = threading.Lock()
+
+
+def normalize_query(text):
+    """Lowercases and collapses whitespace so trivially different queries share a cache entry."""
+    return " ".join(text.lower().split())
+
+
+def get_catalog_version(path=CATALOG_VERSION_PATH):
+    """
+    Returns the current catalog version (0 if never bumped).
+    The file is checked at most once per VERSION_CHECK_INTERVAL and re-read only when it changes.
+    """
+    now = time.monotonic()
+    with _version_lock:
+        if now - _version_state["checked_at"] < VERSION_CHECK_INTERVAL:
+            return _version_state["version"]
+        _version_state["checked_at"] = now
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            _version_state["stat"] = None
+            _version_state["version"] = 0
+            return 0
+
+        stat_key = (st.st_ino, st.st_mtime_ns)
+        if stat_key != _version_state["stat"]:
+            with open(path) as f:
+                _version_state["version"] = int(f.read().strip() or 0)
+            _version_state["stat"] = stat_key
+        return _version_state["version"]
+
+
+def bump_catalog_version(path=CATALOG_VERSION_PATH):
+    """
+    Marks the product catalog as changed, invalidating every cached query result.
+    Called after vectors are ingested or the collection is recreated.
+    """
+    version = time.time_ns()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(version))
+    os.replace(tmp_path, path)
+
+    with _version_lock:
+        # Force the next lookup in this process to see the new version immediately
+        _version_state["checked_at"] = 0.0
+    logger.info(f"Catalog version bumped to {version}")
+    return version
+
+
+class SharedStore:
+    """
+    SQLite-backed cache tier shared by worker processes on the same host.
+    Values are stored as JSON alongside the catalog version they were computed for.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, namespace, key, version):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM query_cache WHERE namespace = ? AND key = ? AND version = ? AND expires_at > ?",
+                (namespace, key, version, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace, key, version, ttl, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (namespace, key, version, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, version, time.time() + ttl, json.dumps(value))
+            )
+            self._conn.commit()
+
+    def purge(self, version):
+        """Deletes entries from older catalog versions and expired entries."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM query_cache WHERE version != ? OR expires_at <= ?",
+                (version, time.time())
+            )
+            self._conn.commit()
+
+
+class QueryCache:
+    """
+    TTL + LRU cache for query results, scoped to the current catalog version.
+
+    Lookups hit an in-process OrderedDict first, then the optional shared SQLite tier.
+    Values are copied on the way in and out, so callers may modify what they get back.
+
+    On a miss, pass the version returned by `lookup` to `set`: a result computed while the
+    catalog changed is then dropped instead of being cached under the new version.
+    """
+
+    def __init__(self, namespace, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, shared_path=CACHE_SHARED_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._version = None
+        self._shared = SharedStore(shared_path) if shared_path else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_sets = 0
+
+    def _check_version(self):
+        """Drops all local entries when the catalog version has moved on. Caller holds the lock."""
+        version = get_catalog_version()
+        if version != self._version:
+            self._entries.clear()
+            if self._shared is not None and self._version is not None:
+                self._shared.purge(version)
+            self._version = version
+        return version
+
+    def get(self, key):
+        """Returns the cached value for `key` (a tuple of JSON-serializable parts), or None on a miss."""
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """
+        Returns (value, catalog_version) for `key`; value is None on a miss. The version is the
+        one the lookup was made under, to be passed to `set` once the result is computed.
+        """
+        if self.ttl <= 0:
+            return None, None
+
+        with self._lock:
+            version = self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[1]), version
+                del self._entries[key]
+                self.expirations += 1
+
+        if self._shared is not None:
+            value = self._shared.get(self.namespace, json.dumps(key), version)
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._store_local(key, copy.deepcopy(value))
+                return value, version
+
+        with self._lock:
+            self.misses += 1
+        return None, version
+
+    def set(self, key, value, version=None):
+        """
+        Stores `value` for `key`. If `version` (from `lookup`) is given and the catalog has moved
+        on since, the value may be stale and is not stored.
+        """
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            current = self._check_version()
+            if version is not None and version != current:
+                self.stale_sets += 1
+                return
+            version = current
+            self._store_local(key, copy.deepcopy(value))
+        if self._shared is not None:
+            self._shared.set(self.namespace, json.dumps(key), version, self.ttl, value)
+
+    def _store_local(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit-rate metrics since process start."""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale_sets": self.stale_sets,
+                "catalog_version": self._version,
+            }
@@ -1,9 +1,14 @@
 import os
+import sys
 import json
 import logging
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from embedding_model import EmbeddingModel
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recommendation.embedding_model import EmbeddingModel
+from recommendation.lexical_index import retrieve, SEARCH_MODE
+from recommendation.query_cache import QueryCache, normalize_query
 from qdrant_client import QdrantClient
 
 # Configure logging
@@ -15,35 +20,48 @@ QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
 COLLECTION_NAME = "product_embeddings"
 
+# Shared by all Recommender instances in the process
+_cache = QueryCache("recommender")
+
+def cache_stats():
+    """Hit-rate metrics of the recommendation result cache for this process."""
+    return _cache.stats()
+
 class Recommender:
     def __init__(self):
         self.encoder = EmbeddingModel()
         self.qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
 
-    def get_recommendations_by_text(self, query, top_k=3):
+    def get_recommendations_by_text(self, query, top_k=3, mode=SEARCH_MODE):
         """
             Recommend products based on text query (Search).
+            Modes match `search_products`: 'dense', 'hybrid' (BM25 + vector results fused)
+            or 'prefilter' (BM25 candidates restrict the vector search).
         """
+        cache_key = ("text", normalize_query(query), top_k, mode)
+        cached, version = _cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             logger.info(f"Generating recommendations for query: '{query}'")
             query_vector = self.encoder.encode(query).tolist()
-            
-            search_result = self.qdrant.search(
-                collection_name=COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=top_k
-            )
+            hits = retrieve(self.qdrant, COLLECTION_NAME, query_vector, query, top_k, mode=mode)
             
             recommendations = []
-            for hit in search_result:
-                recommendations.append({
-                    "product_id": hit.payload.get("product_id"),
-                    "description": hit.payload.get("description"),
-                    "category": hit.payload.get("category"),
-                    "similarity_score": hit.score,
+            for doc_id, score, payload, fused_score in hits:
+                recommendation = {
+                    "product_id": payload.get("product_id"),
+                    "description": payload.get("description"),
+                    "category": payload.get("category"),
+                    "similarity_score": score,
                     "reason": "Matched content description"
-                })
-            
+                }
+                if fused_score is not None:
+                    recommendation["fused_score"] = fused_score
+                recommendations.append(recommendation)
+
+            _cache.set(cache_key, recommendations, version)
             return recommendations
         except Exception as e:
             logger.error(f"Recommendation failed: {e}")
@@ -54,10 +72,15 @@ class Recommender:
         Recommend products based on a list of product descriptions user has liked/viewed.
         Demonstrates aggregation of vectors (User Profile Vector).
         """
+        if not user_history_descriptions:
+            return []
+
+        cache_key = ("history", tuple(normalize_query(d) for d in user_history_descriptions), top_k)
+        cached, version = _cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            if not user_history_descriptions:
-                return []
-            
             logger.info(f"Generating user profile from {len(user_history_descriptions)} items...")
             
             # Generate vectors for all history items
@@ -80,7 +103,8 @@ class Recommender:
                     "score": hit.score,
                     "reason": "Based on aggregate user history"
                 })
-                
+
+            _cache.set(cache_key, recommendations, version)
             return recommendations
             
         except Exception as e:
@@ -113,6 +137,7 @@ def generate_sample_outputs():
     with open("recommendation/recommendations.json", "w") as f:
         json.dump(output_data, f, indent=2)
     logger.info("Saved recommendations.json")
+    logger.info(f"Cache stats: {cache_stats()}")
 
 if __name__ == "__main__":
     generate_sample_outputs()